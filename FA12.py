@@ -41,6 +41,7 @@ class FA12_config:
         self,
         support_upgradable_metadata         = False,
         use_token_metadata_offchain_view    = True,
+        support_pause                       = True,
     ):
         self.support_upgradable_metadata = support_upgradable_metadata
         # Whether the contract metadata can be upgradable or not.
@@ -49,22 +50,31 @@ class FA12_config:
         self.use_token_metadata_offchain_view = use_token_metadata_offchain_view
         # Include offchain view for accessing the token metadata (requires TZIP-016 contract metadata)
 
+        self.support_pause = support_pause
+        # Whether the administrator can pause transfers and approvals.
+        # When False the `%paused` storage field, the `setPause` entrypoint
+        # and the pause checks are not generated at all.
+
 class FA12_common:
     def normalize_metadata(self, metadata):
         """
             Helper function to build metadata JSON (string => bytes).
-        """
-        for key in metadata:
-            metadata[key] = sp.utils.bytes_of_string(metadata[key])
 
-        return metadata
+            Values that are not strings are assumed to be already encoded
+            and are kept as they are. The given dict is left untouched.
+        """
+        return {
+            key: sp.utils.bytes_of_string(value) if isinstance(value, str) else value
+            for key, value in metadata.items()
+        }
 
 class FA12_core(sp.Contract, FA12_common):
     def __init__(self, config, **extra_storage):
         self.config = config
 
         self.init(
-            balances = sp.big_map(tvalue = sp.TRecord(approvals = sp.TMap(sp.TAddress, sp.TNat), balance = sp.TNat)),
+            balances = sp.big_map(tkey = sp.TAddress, tvalue = sp.TNat),
+            allowances = sp.big_map(tkey = sp.TRecord(owner = sp.TAddress, spender = sp.TAddress), tvalue = sp.TNat),
             totalSupply = 0,
             **extra_storage
         )
@@ -72,50 +82,75 @@ class FA12_core(sp.Contract, FA12_common):
     @sp.entry_point
     def transfer(self, params):
         sp.set_type(params, sp.TRecord(from_ = sp.TAddress, to_ = sp.TAddress, value = sp.TNat).layout(("from_ as from", ("to_ as to", "value"))))
-        sp.verify(self.is_administrator(sp.sender) |
-            (~self.is_paused() &
-                ((params.from_ == sp.sender) |
-                 (self.data.balances[params.from_].approvals[sp.sender] >= params.value))), FA12_Error.NotAllowed)
-        self.addAddressIfNecessary(params.from_)
-        self.addAddressIfNecessary(params.to_)
-        sp.verify(self.data.balances[params.from_].balance >= params.value, FA12_Error.InsufficientBalance)
-        self.data.balances[params.from_].balance = sp.as_nat(self.data.balances[params.from_].balance - params.value)
-        self.data.balances[params.to_].balance += params.value
-        sp.if (params.from_ != sp.sender) & (~self.is_administrator(sp.sender)):
-            self.data.balances[params.from_].approvals[sp.sender] = sp.as_nat(self.data.balances[params.from_].approvals[sp.sender] - params.value)
+        is_admin = sp.local("is_admin", self.is_administrator(sp.sender))
+        allowance_key = sp.record(owner = params.from_, spender = sp.sender)
+        allowance = sp.local("allowance", sp.nat(0))
+        # The allowance is only read when someone else's tokens are moved.
+        sp.if ~is_admin.value:
+            if self.config.support_pause:
+                sp.verify(~self.is_paused(), FA12_Error.NotAllowed)
+            sp.if params.from_ != sp.sender:
+                allowance.value = self.data.allowances.get(allowance_key, 0)
+                sp.verify(allowance.value >= params.value, FA12_Error.NotAllowed)
+        # If value is 0 we do nothing now:
+        sp.if params.value > 0:
+            from_balance = sp.local("from_balance", self.data.balances.get(params.from_, 0))
+            sp.verify(from_balance.value >= params.value, FA12_Error.InsufficientBalance)
+            self.data.balances[params.from_] = abs(from_balance.value - params.value)
+            # Read after the debit so that a self-transfer sees the updated balance.
+            self.data.balances[params.to_] = self.data.balances.get(params.to_, 0) + params.value
+            sp.if (params.from_ != sp.sender) & (~is_admin.value):
+                remaining = sp.local("remaining", abs(allowance.value - params.value))
+                sp.if remaining.value == 0:
+                    del self.data.allowances[allowance_key]
+                sp.else:
+                    self.data.allowances[allowance_key] = remaining.value
+        sp.else:
+            pass
 
     @sp.entry_point
     def approve(self, params):
         sp.set_type(params, sp.TRecord(spender = sp.TAddress, value = sp.TNat).layout(("spender", "value")))
-        self.addAddressIfNecessary(sp.sender)
-        sp.verify(~self.is_paused(), FA12_Error.Paused)
-        alreadyApproved = self.data.balances[sp.sender].approvals.get(params.spender, 0)
+        if self.config.support_pause:
+            sp.verify(~self.is_paused(), FA12_Error.Paused)
+        allowance_key = sp.record(owner = sp.sender, spender = params.spender)
+        alreadyApproved = self.data.allowances.get(allowance_key, 0)
         sp.verify((alreadyApproved == 0) | (params.value == 0), FA12_Error.UnsafeAllowanceChange)
-        self.data.balances[sp.sender].approvals[params.spender] = params.value
-
-    def addAddressIfNecessary(self, address):
-        sp.if ~ self.data.balances.contains(address):
-            self.data.balances[address] = sp.record(balance = 0, approvals = {})
+        # Zero allowances are removed rather than stored.
+        sp.if params.value == 0:
+            del self.data.allowances[allowance_key]
+        sp.else:
+            self.data.allowances[allowance_key] = params.value
 
     @sp.utils.view(sp.TNat)
     def getBalance(self, params):
-        sp.if self.data.balances.contains(params):
-            sp.result(self.data.balances[params].balance)
-        sp.else:
-            sp.result(sp.nat(0))
+        sp.result(self.data.balances.get(params, sp.nat(0)))
 
     @sp.utils.view(sp.TNat)
     def getAllowance(self, params):
-        sp.if self.data.balances.contains(params.owner):
-            sp.result(self.data.balances[params.owner].approvals.get(params.spender, 0))
-        sp.else:
-            sp.result(sp.nat(0))
+        sp.result(self.data.allowances.get(sp.record(owner = params.owner, spender = params.spender), 0))
 
     @sp.utils.view(sp.TNat)
     def getTotalSupply(self, params):
         sp.set_type(params, sp.TUnit)
         sp.result(self.data.totalSupply)
 
+    # On-chain views mirroring the callback views above, so that read-only
+    # callers don't need to originate a contract to receive the result.
+    @sp.onchain_view()
+    def view_balance(self, owner):
+        sp.set_type(owner, sp.TAddress)
+        sp.result(self.data.balances.get(owner, sp.nat(0)))
+
+    @sp.onchain_view()
+    def view_allowance(self, params):
+        sp.set_type(params, sp.TRecord(owner = sp.TAddress, spender = sp.TAddress))
+        sp.result(self.data.allowances.get(params, sp.nat(0)))
+
+    @sp.onchain_view()
+    def view_totalSupply(self):
+        sp.result(self.data.totalSupply)
+
     # this is not part of the standard but can be supported through inheritance.
     def is_paused(self):
         return sp.bool(False)
@@ -128,17 +163,35 @@ class FA12_mint_burn(FA12_core):
     @sp.entry_point
     def mint(self, params):
         sp.set_type(params, sp.TRecord(address = sp.TAddress, value = sp.TNat))
-        self.addAddressIfNecessary(params.address)
-        self.data.balances[params.address].balance += params.value
-        self.data.totalSupply += params.value
+        sp.if params.value > 0:
+            self.data.balances[params.address] = self.data.balances.get(params.address, 0) + params.value
+            self.data.totalSupply += params.value
+        sp.else:
+            pass
+
+    @sp.entry_point
+    def mint_batch(self, params):
+        sp.set_type(params, sp.TList(sp.TRecord(address = sp.TAddress, value = sp.TNat)))
+        sp.verify(self.is_administrator(sp.sender), FA12_Error.NotAdmin)
+        minted = sp.local("minted", sp.nat(0))
+        sp.for item in params:
+            sp.if item.value > 0:
+                self.data.balances[item.address] = self.data.balances.get(item.address, 0) + item.value
+                minted.value += item.value
+        sp.if minted.value > 0:
+            self.data.totalSupply += minted.value
 
     @sp.entry_point
     def burn(self, params):
         sp.set_type(params, sp.TRecord(address = sp.TAddress, value = sp.TNat))
         sp.verify(self.is_administrator(sp.sender), FA12_Error.NotAdmin)
-        sp.verify(self.data.balances[params.address].balance >= params.value, FA12_Error.InsufficientBalance)
-        self.data.balances[params.address].balance = sp.as_nat(self.data.balances[params.address].balance - params.value)
-        self.data.totalSupply = sp.as_nat(self.data.totalSupply - params.value)
+        sp.if params.value > 0:
+            balance = sp.local("balance", self.data.balances.get(params.address, 0))
+            sp.verify(balance.value >= params.value, FA12_Error.InsufficientBalance)
+            self.data.balances[params.address] = abs(balance.value - params.value)
+            self.data.totalSupply = abs(self.data.totalSupply - params.value)
+        sp.else:
+            pass
 
 class FA12_administrator(FA12_core):
     def is_administrator(self, sender):
@@ -155,15 +208,27 @@ class FA12_administrator(FA12_core):
         sp.set_type(params, sp.TUnit)
         sp.result(self.data.administrator)
 
+    @sp.onchain_view()
+    def view_administrator(self):
+        sp.result(self.data.administrator)
+
 class FA12_pause(FA12_core):
     def is_paused(self):
         return self.data.paused
 
-    @sp.entry_point
-    def setPause(self, params):
-        sp.set_type(params, sp.TBool)
-        sp.verify(self.is_administrator(sp.sender), FA12_Error.NotAdmin)
-        self.data.paused = params
+    def set_pause_support(self):
+        """
+           Add the `%paused` storage field and the `setPause` entrypoint.
+
+           Only called when `FA12_config(support_pause = True, ...)`.
+        """
+        self.update_initial_storage(paused = False)
+
+        def setPause(self, params):
+            sp.set_type(params, sp.TBool)
+            sp.verify(self.is_administrator(sp.sender), FA12_Error.NotAdmin)
+            self.data.paused = params
+        self.setPause = sp.entry_point(setPause)
 
 class FA12_token_metadata(FA12_core):
     """
@@ -203,7 +268,7 @@ class FA12_contract_metadata(FA12_core):
 
         This class offers utilities to define and set TZIP-016 contract metadata.
     """
-    def generate_tzip16_metadata(self):
+    def generate_tzip16_metadata(self, with_token_metadata_view = False):
         views = []
 
         def token_metadata(self, token_id):
@@ -219,7 +284,7 @@ class FA12_contract_metadata(FA12_core):
             sp.set_type(token_id, sp.TNat)
             sp.result(self.data.token_metadata[token_id])
 
-        if self.usingTokenMetadata and self.config.use_token_metadata_offchain_view:
+        if with_token_metadata_view:
             self.token_metadata = sp.offchain_view(pure = True, doc = "Get Token Metadata")(token_metadata)
             views += [self.token_metadata]
 
@@ -258,7 +323,10 @@ class FA12(
     FA12_core
 ):
     def __init__(self, admin, config, token_metadata = None, contract_metadata = None):
-        FA12_core.__init__(self, config, paused = False, administrator = admin)
+        FA12_core.__init__(self, config, administrator = admin)
+
+        if config.support_pause:
+            self.set_pause_support()
 
         if token_metadata is None and contract_metadata is None:
             raise Exception(
@@ -271,16 +339,16 @@ class FA12(
             """
             )
 
-        self.usingTokenMetadata = False
         if token_metadata is not None:
-            self.usingTokenMetadata = True
             self.set_token_metadata(token_metadata)
         if contract_metadata is not None:
             self.set_contract_metadata(contract_metadata)
 
         # This is only an helper, it produces metadata in the output panel
         # that users can copy and upload to IPFS.
-        self.generate_tzip16_metadata()
+        self.generate_tzip16_metadata(
+            with_token_metadata_view = token_metadata is not None and self.config.use_token_metadata_offchain_view
+        )
 
 class Viewer(sp.Contract):
     def __init__(self, t):
@@ -345,19 +413,24 @@ if "templates" not in __name__ and __name__ != "__main__":
         offchainViewTester = TestOffchainView(c1.token_metadata)
         scenario.register(offchainViewTester)
         offchainViewTester.compute(data = c1.data, params = 0)
-        scenario.verify_equal(
-            offchainViewTester.data.result,
-            sp.some(
-                sp.record(
-                    token_id = 0,
-                    token_info = sp.map({
+        # Compare packed hashes so the check doesn't grow with the metadata map.
+        expected_token_metadata_hash = sp.blake2b(sp.pack(
+            sp.record(
+                token_id = sp.nat(0),
+                token_info = sp.map(
+                    {
                         "decimals"    : sp.utils.bytes_of_string("18"),
                         "name"        : sp.utils.bytes_of_string("My Great Token"),
                         "symbol"      : sp.utils.bytes_of_string("MGT"),
                         "icon"        : sp.utils.bytes_of_string('https://smartpy.io/static/img/logo-only.svg')
-                    })
+                    },
+                    tkey = sp.TString,
+                    tvalue = sp.TBytes
                 )
             )
+        ))
+        scenario.verify(
+            sp.blake2b(sp.pack(offchainViewTester.data.result.open_some())) == expected_token_metadata_hash
         )
 
         scenario.h1("Attempt to update metadata")
@@ -368,13 +441,21 @@ if "templates" not in __name__ and __name__ != "__main__":
         scenario.verify(c1.data.metadata[""] == sp.bytes("0x00"))
 
         scenario.h1("Entry points")
+        scenario.h2("Alice tries to batch-mint coins")
+        c1.mint_batch([
+            sp.record(address = alice.address, value = 12),
+        ]).run(sender = alice, valid = False)
         scenario.h2("Admin mints a few coins")
-        c1.mint(address = alice.address, value = 12).run(sender = admin)
-        c1.mint(address = alice.address, value = 3).run(sender = admin)
-        c1.mint(address = alice.address, value = 3).run(sender = admin)
+        c1.mint_batch([
+            sp.record(address = alice.address, value = 12),
+            sp.record(address = alice.address, value = 3),
+            sp.record(address = alice.address, value = 3),
+        ]).run(sender = admin)
+        scenario.verify(c1.data.balances[alice.address] == 18)
+        scenario.verify(c1.data.totalSupply == 18)
         scenario.h2("Alice transfers to Bob")
         c1.transfer(from_ = alice.address, to_ = bob.address, value = 4).run(sender = alice)
-        scenario.verify(c1.data.balances[alice.address].balance == 14)
+        scenario.verify(c1.data.balances[alice.address] == 14)
         scenario.h2("Bob tries to transfer from Alice but he doesn't have her approval")
         c1.transfer(from_ = alice.address, to_ = bob.address, value = 4).run(sender = bob, valid = False)
         scenario.h2("Alice approves Bob and Bob transfers")
@@ -384,23 +465,23 @@ if "templates" not in __name__ and __name__ != "__main__":
         c1.transfer(from_ = alice.address, to_ = bob.address, value = 4).run(sender = bob, valid = False)
         scenario.h2("Admin burns Bob token")
         c1.burn(address = bob.address, value = 1).run(sender = admin)
-        scenario.verify(c1.data.balances[alice.address].balance == 10)
+        scenario.verify(c1.data.balances[alice.address] == 10)
         scenario.h2("Alice tries to burn Bob token")
         c1.burn(address = bob.address, value = 1).run(sender = alice, valid = False)
         scenario.h2("Admin pauses the contract and Alice cannot transfer anymore")
         c1.setPause(True).run(sender = admin)
         c1.transfer(from_ = alice.address, to_ = bob.address, value = 4).run(sender = alice, valid = False)
-        scenario.verify(c1.data.balances[alice.address].balance == 10)
+        scenario.verify(c1.data.balances[alice.address] == 10)
         scenario.h2("Admin transfers while on pause")
         c1.transfer(from_ = alice.address, to_ = bob.address, value = 1).run(sender = admin)
         scenario.h2("Admin unpauses the contract and transferts are allowed")
         c1.setPause(False).run(sender = admin)
-        scenario.verify(c1.data.balances[alice.address].balance == 9)
+        scenario.verify(c1.data.balances[alice.address] == 9)
         c1.transfer(from_ = alice.address, to_ = bob.address, value = 1).run(sender = alice)
 
         scenario.verify(c1.data.totalSupply == 17)
-        scenario.verify(c1.data.balances[alice.address].balance == 8)
-        scenario.verify(c1.data.balances[bob.address].balance == 9)
+        scenario.verify(c1.data.balances[alice.address] == 8)
+        scenario.verify(c1.data.balances[bob.address] == 9)
 
         scenario.h1("Views")
         scenario.h2("Balance")
@@ -427,6 +508,84 @@ if "templates" not in __name__ and __name__ != "__main__":
         c1.getAllowance((sp.record(owner = alice.address, spender = bob.address), view_allowance.typed.target))
         scenario.verify_equal(view_allowance.data.last, sp.some(1))
 
+        scenario.h1("On-chain views")
+        scenario.verify(c1.view_balance(alice.address) == 8)
+        scenario.verify(c1.view_balance(admin.address) == 0)
+        scenario.verify(c1.view_allowance(sp.record(owner = alice.address, spender = bob.address)) == 1)
+        scenario.verify(c1.view_totalSupply() == 17)
+        scenario.verify(c1.view_administrator() == admin.address)
+
+        scenario.h1("Zero allowances are removed")
+        scenario.h2("Bob spends the rest of Alice's allowance")
+        c1.transfer(from_ = alice.address, to_ = bob.address, value = 1).run(sender = bob)
+        scenario.verify(~c1.data.allowances.contains(sp.record(owner = alice.address, spender = bob.address)))
+        scenario.verify(c1.data.balances[alice.address] == 7)
+        scenario.verify(c1.data.balances[bob.address] == 10)
+        scenario.h2("Alice resets an allowance to 0 and approves again")
+        c1.approve(spender = bob.address, value = 3).run(sender = alice)
+        c1.approve(spender = bob.address, value = 0).run(sender = alice)
+        scenario.verify(~c1.data.allowances.contains(sp.record(owner = alice.address, spender = bob.address)))
+        c1.approve(spender = bob.address, value = 2).run(sender = alice)
+        scenario.verify(c1.data.allowances[sp.record(owner = alice.address, spender = bob.address)] == 2)
+
+        scenario.h1("Zero-value calls don't touch storage")
+        carol = sp.test_account("Carol")
+        scenario.h2("Carol transfers 0 from her unknown address")
+        c1.transfer(from_ = carol.address, to_ = bob.address, value = 0).run(sender = carol)
+        scenario.verify(~c1.data.balances.contains(carol.address))
+        scenario.verify(c1.data.balances[bob.address] == 10)
+        scenario.h2("Carol transfers 0 from Alice without an allowance")
+        c1.transfer(from_ = alice.address, to_ = carol.address, value = 0).run(sender = carol)
+        scenario.verify(~c1.data.allowances.contains(sp.record(owner = alice.address, spender = carol.address)))
+        scenario.verify(~c1.data.balances.contains(carol.address))
+        scenario.verify(c1.data.balances[alice.address] == 7)
+        scenario.h2("Admin mints and burns 0 for Carol")
+        c1.mint(address = carol.address, value = 0).run(sender = admin)
+        scenario.verify(~c1.data.balances.contains(carol.address))
+        scenario.verify(c1.data.totalSupply == 17)
+        c1.burn(address = carol.address, value = 0).run(sender = admin)
+        scenario.verify(~c1.data.balances.contains(carol.address))
+        scenario.verify(c1.data.totalSupply == 17)
+
+        scenario.h1("Single mint")
+        c1.mint(address = bob.address, value = 2).run(sender = admin)
+        scenario.verify(c1.data.balances[bob.address] == 12)
+        scenario.verify(c1.data.totalSupply == 19)
+
+    @sp.add_test(name = "FA12_no_pause")
+    def test_no_pause():
+        scenario = sp.test_scenario()
+        scenario.h1("FA1.2 template - without pause support")
+
+        admin = sp.test_account("Administrator")
+        alice = sp.test_account("Alice")
+        bob   = sp.test_account("Robert")
+
+        c1 = FA12(
+            admin.address,
+            config              = FA12_config(support_pause = False),
+            contract_metadata   = {
+                "" : "ipfs://QmaiAUj1FFNGYTu8rLBjc3eeN9cSKwaF8EGMBNDmhzPNFd",
+            }
+        )
+        scenario += c1
+
+        # No setPause entrypoint is generated.
+        assert not hasattr(c1, "setPause")
+
+        scenario.h2("Admin mints a few coins")
+        c1.mint(address = alice.address, value = 10).run(sender = admin)
+        scenario.h2("Alice transfers to herself")
+        c1.transfer(from_ = alice.address, to_ = alice.address, value = 3).run(sender = alice)
+        scenario.verify(c1.data.balances[alice.address] == 10)
+        scenario.h2("Alice approves Bob and Bob transfers")
+        c1.approve(spender = bob.address, value = 5).run(sender = alice)
+        scenario.verify(c1.data.allowances[sp.record(owner = alice.address, spender = bob.address)] == 5)
+        c1.transfer(from_ = alice.address, to_ = bob.address, value = 4).run(sender = bob)
+        scenario.verify(c1.data.balances[alice.address] == 6)
+        scenario.verify(c1.data.balances[bob.address] == 4)
+        scenario.verify(c1.data.allowances[sp.record(owner = alice.address, spender = bob.address)] == 1)
+
     # sp.add_compilation_target(
     #     "FA1_2",
     #     FA12(